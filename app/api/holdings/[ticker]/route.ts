@@ -1,12 +1,23 @@
 import { NextResponse } from 'next/server';
 
+// Holdings query server started with `python scripts/etf-pipeline/query.py serve`
+const QUERY_SERVER_URL = process.env.QUERY_SERVER_URL ?? 'http://127.0.0.1:8765';
+
 export async function GET(request: Request, props: { params: Promise<{ ticker: string }> }) {
     const params = await props.params;
     const ticker = params.ticker;
 
-    // Placeholder mock response
-    return NextResponse.json(
-        { error: `Data for ${ticker} not found` },
-        { status: 404 }
-    );
+    try {
+        const response = await fetch(
+            `${QUERY_SERVER_URL}/funds/${encodeURIComponent(ticker)}/holdings`,
+            { cache: 'no-store' }
+        );
+        const body = await response.json();
+        return NextResponse.json(body, { status: response.status });
+    } catch {
+        return NextResponse.json(
+            { error: 'Holdings query server unavailable' },
+            { status: 503 }
+        );
+    }
 }
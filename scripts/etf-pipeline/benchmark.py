@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+
+Measures CLI startup time, query latency and validation time. Startup
+cases run in a fresh interpreter so import and initialization costs are
+included; queries and validation run over synthetic holdings.
+
+Usage:
+    python benchmark.py [--runs N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+
+STARTUP_CASES = {
+    "python collect.py --help": [sys.executable, "collect.py", "--help"],
+    "import collect": [sys.executable, "-c", "import collect"],
+    # What every startup paid before imports were deferred
+    "eager imports + ETFScraper()": [
+        sys.executable,
+        "-c",
+        "import pandas, yfinance, tenacity, tqdm; "
+        "from etf_scraper import ETFScraper; ETFScraper()",
+    ],
+}
+
+
+def time_command(command: list[str], runs: int) -> list[float]:
+    """Run a command several times and return the wall-clock durations."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPT_DIR, capture_output=True, check=True)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def bench_startup(runs: int):
+    """Print startup time for each CLI case."""
+    print(f"Startup time ({runs} runs)")
+    print(f"{'case':<32} {'median':>10} {'min':>10}")
+    for name, command in STARTUP_CASES.items():
+        try:
+            durations = time_command(command, runs)
+        except subprocess.CalledProcessError:
+            print(f"{name:<32} {'failed':>10}")
+            continue
+        median = statistics.median(durations) * 1000
+        best = min(durations) * 1000
+        print(f"{name:<32} {median:>8.1f}ms {best:>8.1f}ms")
+
+
+def bench_queries(runs: int, funds: int = 25, holdings_per_fund: int = 2000):
+    """Print per-call latency of each index query."""
+    import numpy as np
+    import pandas as pd
+
+    from collect import write_csv_files
+    from query import HoldingsIndex, build_index
+
+    rng = np.random.default_rng(0)
+    fund_tickers = [f"F{i:04d}" for i in range(funds)]
+    stock_tickers = [f"S{i:05d}" for i in range(holdings_per_fund * 3)]
+    sectors = ["Technology", "Financials", "Energy", "Healthcare", None]
+
+    holdings_df = pd.DataFrame(
+        {
+            "fund_ticker": np.repeat(fund_tickers, holdings_per_fund),
+            "stock_ticker": np.concatenate(
+                [
+                    rng.choice(stock_tickers, holdings_per_fund, replace=False)
+                    for _ in fund_tickers
+                ]
+            ),
+            "weight": rng.random(funds * holdings_per_fund),
+        }
+    )
+    stocks_df = pd.DataFrame(
+        {
+            "ticker": stock_tickers,
+            "sector": [sectors[i % len(sectors)] for i in range(len(stock_tickers))],
+        }
+    )
+    funds_df = pd.DataFrame({"ticker": fund_tickers})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        write_csv_files(holdings_df, stocks_df, funds_df, output_dir=data_dir)
+        index = HoldingsIndex(build_index(data_dir, Path(tmp) / "index"))
+
+        portfolio = {ticker: 1000.0 for ticker in fund_tickers[:5]}
+        cases = {
+            "fund_holdings (top 10)": lambda: index.fund_holdings(fund_tickers[0], 10),
+            "stock_holders": lambda: index.stock_holders(stock_tickers[0]),
+            "top_exposure (5 funds)": lambda: index.top_exposure(portfolio, 10),
+            "sector_breakdown (5 funds)": lambda: index.sector_breakdown(portfolio),
+        }
+
+        print(f"\nQuery latency ({len(holdings_df)} holdings, {runs * 100} calls)")
+        print(f"{'case':<32} {'per call':>10}")
+        for name, query in cases.items():
+            start = time.perf_counter()
+            for _ in range(runs * 100):
+                query()
+            per_call = (time.perf_counter() - start) / (runs * 100) * 1e6
+            print(f"{name:<32} {per_call:>8.1f}us")
+
+
+def bench_validation(runs: int, funds: int = 50, holdings_per_fund: int = 2000):
+    """Print the time to validate a full set of holdings."""
+    import numpy as np
+    import pandas as pd
+
+    from validate import report_problems, validate_holdings
+
+    rng = np.random.default_rng(0)
+    fund_tickers = [f"F{i:04d}" for i in range(funds)]
+    holdings_df = pd.DataFrame(
+        {
+            "fund_ticker": np.repeat(fund_tickers, holdings_per_fund),
+            "stock_ticker": [f"S{i:05d}" for i in range(holdings_per_fund)] * funds,
+            "weight": 100 / holdings_per_fund,
+        }
+    )
+    funds_df = pd.DataFrame(
+        {"ticker": fund_tickers, "total_holdings": holdings_per_fund}
+    )
+
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        report_problems(validate_holdings(holdings_df, funds_df, funds_df))
+        durations.append(time.perf_counter() - start)
+
+    print(f"\nValidation ({len(holdings_df)} holdings, {runs} runs)")
+    print(f"{'validate_holdings':<32} {statistics.median(durations) * 1000:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ETF pipeline.")
+    parser.add_argument("--runs", type=int, default=10, help="runs per case")
+    args = parser.parse_args()
+
+    bench_startup(args.runs)
+    bench_queries(args.runs)
+    bench_validation(args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,22 +6,55 @@ Fetches ETF holdings from major providers (iShares, Vanguard, SPDR, Invesco),
 enriches stocks with sector/industry data, and outputs CSV files.
 """
 
-import os
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
 import re
+import sys
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from config import TRACKED_ETFS, OUTPUT_DIR, SHARD_DIR, FRACTION_WEIGHT_SUM_MAX
+
+# pandas, yfinance, etf_scraper, tenacity and tqdm are imported inside the
+# functions that use them, so `--help` and the tests start without them
+if TYPE_CHECKING:
+    import pandas as pd
+
+_etf_scraper = None
+
 
-import pandas as pd
-import yfinance as yf
-from etf_scraper import ETFScraper
-from tenacity import retry, stop_after_attempt, wait_exponential
-from tqdm import tqdm
+def get_etf_scraper():
+    """Get the shared ETF scraper, creating it on first use."""
+    global _etf_scraper
+    if _etf_scraper is None:
+        from etf_scraper import ETFScraper
 
-from config import TRACKED_ETFS, OUTPUT_DIR
+        _etf_scraper = ETFScraper()
+    return _etf_scraper
 
-# Initialize ETF scraper
-etf_scraper = ETFScraper()
+
+def with_retry(func):
+    """Retry with exponential backoff (tenacity is imported on first call)."""
+    retrying = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal retrying
+        if retrying is None:
+            from tenacity import retry, stop_after_attempt, wait_exponential
+
+            retrying = retry(
+                stop=stop_after_attempt(3),
+                wait=wait_exponential(multiplier=1, min=2, max=10),
+            )(func)
+        return retrying(*args, **kwargs)
+
+    return wrapper
 
 
 # ============================================================================
@@ -89,11 +122,11 @@ def is_equity_ticker(ticker: str | None) -> bool:
 # ============================================================================
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+@with_retry
 def fetch_single_etf(ticker: str) -> pd.DataFrame | None:
     """Fetch holdings for a single ETF with retry logic."""
     try:
-        holdings = etf_scraper.query_holdings(ticker)
+        holdings = get_etf_scraper().query_holdings(ticker)
         if holdings is None or (hasattr(holdings, "empty") and holdings.empty):
             return None
         return holdings
@@ -102,22 +135,32 @@ def fetch_single_etf(ticker: str) -> pd.DataFrame | None:
         raise
 
 
-def fetch_all_holdings() -> tuple[pd.DataFrame, pd.DataFrame]:
+def fetch_all_holdings(
+    tracked_etfs: dict[str, list[str]] | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Fetch holdings from all tracked ETFs.
 
+    Args:
+        tracked_etfs: Provider → ETF tickers mapping (defaults to TRACKED_ETFS)
+
     Returns:
         tuple: (holdings_df, funds_df)
     """
+    import pandas as pd
+
+    if tracked_etfs is None:
+        tracked_etfs = TRACKED_ETFS
+
     all_holdings = []
     funds_data = []
 
-    total_etfs = sum(len(etfs) for etfs in TRACKED_ETFS.values())
+    total_etfs = sum(len(etfs) for etfs in tracked_etfs.values())
     print(
-        f"\nFetching holdings from {len(TRACKED_ETFS)} providers, {total_etfs} ETFs...\n"
+        f"\nFetching holdings from {len(tracked_etfs)} providers, {total_etfs} ETFs...\n"
     )
 
-    for provider, etf_list in TRACKED_ETFS.items():
+    for provider, etf_list in tracked_etfs.items():
         for ticker in etf_list:
             try:
                 print(f"[{provider}] {ticker}: ", end="", flush=True)
@@ -171,6 +214,7 @@ def normalize_holdings_df(
     df: pd.DataFrame, provider: str, fund_ticker: str
 ) -> pd.DataFrame:
     """Normalize holdings DataFrame to consistent schema."""
+    import pandas as pd
 
     # Create a standardized DataFrame
     normalized = pd.DataFrame()
@@ -221,10 +265,11 @@ def normalize_holdings_df(
     # Convert weight to float (handle percentages)
     if "weight" in normalized.columns:
         normalized["weight"] = pd.to_numeric(normalized["weight"], errors="coerce")
-        # If weights are > 1, assume they're percentages
-        if normalized["weight"].max() > 1:
-            # Keep as percentage for readability
-            pass
+        # Weights summing to ~1 are fractions; store percentages for readability.
+        # The sum includes non-equity rows, which are filtered out below
+        weight_sum = normalized["weight"].sum()
+        if 0 < weight_sum <= FRACTION_WEIGHT_SUM_MAX:
+            normalized["weight"] = normalized["weight"] * 100
 
     # Filter to only equity holdings
     normalized = normalized[normalized["stock_ticker"].apply(is_equity_ticker)]
@@ -261,9 +306,11 @@ def extract_unique_stocks(holdings_df: pd.DataFrame) -> pd.DataFrame:
     return stocks
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+@with_retry
 def fetch_stock_info(ticker: str) -> dict:
     """Fetch stock info from Yahoo Finance."""
+    import yfinance as yf
+
     try:
         stock = yf.Ticker(ticker)
         info = stock.info
@@ -284,6 +331,8 @@ def fetch_stock_info(ticker: str) -> dict:
 
 def enrich_stocks(stocks_df: pd.DataFrame) -> pd.DataFrame:
     """Enrich stocks with sector/industry data from Yahoo Finance."""
+    import pandas as pd
+    from tqdm import tqdm
 
     print(f"\nEnriching stock data from Yahoo Finance...")
 
@@ -339,67 +388,323 @@ def enrich_stocks(stocks_df: pd.DataFrame) -> pd.DataFrame:
 # CSV Output
 # ============================================================================
 
+HOLDINGS_COLUMNS = [
+    "fund_ticker",
+    "fund_name",
+    "provider",
+    "as_of_date",
+    "stock_ticker",
+    "stock_name",
+    "cusip",
+    "isin",
+    "weight",
+    "shares",
+    "market_value",
+]
+
+STOCKS_COLUMNS = [
+    "ticker",
+    "name",
+    "cusip",
+    "isin",
+    "sector",
+    "industry",
+    "market_cap",
+    "exchange",
+]
+
+FUNDS_COLUMNS = [
+    "ticker",
+    "name",
+    "provider",
+    "total_holdings",
+    "as_of_date",
+    "collected_at",
+]
+
+
+def get_output_dir() -> Path:
+    """Get the canonical output directory (relative to this script)."""
+    return Path(__file__).parent / OUTPUT_DIR
+
+
+def _write_csv(df: pd.DataFrame, path: Path, columns: list[str]) -> None:
+    """Write the known columns of a DataFrame to CSV."""
+    if df.empty:
+        # Keep the header so empty files can still be read back
+        out = df.reindex(columns=columns)
+    else:
+        out = df[[c for c in columns if c in df.columns]]
+    out.to_csv(path, index=False, encoding="utf-8")
+    print(f"✓ {path.name} ({len(out)} rows)")
+
+
+def read_csv_output(path: Path) -> pd.DataFrame:
+    """Read a CSV file written by this script, keeping identifiers as strings."""
+    import pandas as pd
+
+    # Tickers like "NA" or "005930" are real symbols, so read them verbatim
+    # and only count empty cells as missing
+    return pd.read_csv(
+        path,
+        dtype={
+            "ticker": str,
+            "fund_ticker": str,
+            "stock_ticker": str,
+            "cusip": str,
+            "isin": str,
+        },
+        keep_default_na=False,
+        na_values=[""],
+        encoding="utf-8",
+    )
+
 
 def write_csv_files(
-    holdings_df: pd.DataFrame, stocks_df: pd.DataFrame, funds_df: pd.DataFrame
+    holdings_df: pd.DataFrame,
+    stocks_df: pd.DataFrame,
+    funds_df: pd.DataFrame,
+    output_dir: Path | None = None,
 ):
     """Write all data to CSV files."""
 
-    # Get output directory (relative to this script)
-    script_dir = Path(__file__).parent
-    output_dir = script_dir / OUTPUT_DIR
+    if output_dir is None:
+        output_dir = get_output_dir()
     output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"\nWriting CSV files to {output_dir}...")
 
-    # Holdings CSV
-    holdings_path = output_dir / "holdings.csv"
-    holdings_cols = [
+    _write_csv(holdings_df, output_dir / "holdings.csv", HOLDINGS_COLUMNS)
+    _write_csv(stocks_df, output_dir / "stocks.csv", STOCKS_COLUMNS)
+    _write_csv(funds_df, output_dir / "funds.csv", FUNDS_COLUMNS)
+
+
+def check_publishable(
+    holdings_df: pd.DataFrame, funds_df: pd.DataFrame, force: bool = False
+) -> bool:
+    """
+    Validate holdings against the published funds.csv.
+
+    Only holdings and funds are needed, so this can run before enrichment.
+
+    Returns:
+        bool: False if validation failed and force is not set
+    """
+    from validate import report_problems, validate_holdings
+
+    previous_path = get_output_dir() / "funds.csv"
+    previous_funds_df = (
+        read_csv_output(previous_path) if previous_path.exists() else None
+    )
+
+    print("\nValidating data...")
+    report = validate_holdings(holdings_df, funds_df, previous_funds_df)
+    problems = report_problems(report)
+    for problem in problems:
+        print(f"✗ {problem}")
+
+    if problems and not force:
+        print(f"\n{len(problems)} checks failed; not publishing (use --force)")
+        return False
+    if not problems:
+        print(f"✓ {len(report)} funds passed validation")
+    return True
+
+
+def publish_csv_files(
+    holdings_df: pd.DataFrame,
+    stocks_df: pd.DataFrame,
+    funds_df: pd.DataFrame,
+    force: bool = False,
+) -> bool:
+    """
+    Validate the data against the published funds.csv, then write it.
+
+    Returns:
+        bool: False if validation failed and nothing was written
+    """
+    if not check_publishable(holdings_df, funds_df, force):
+        return False
+
+    write_csv_files(holdings_df, stocks_df, funds_df)
+    return True
+
+
+# ============================================================================
+# Sharding
+# ============================================================================
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """
+    Parse a shard spec of the form "i/N" into (index, count).
+
+    Examples:
+        "0/4" → (0, 4)
+        "3/4" → (3, 4)
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec or "")
+    if not match:
+        raise ValueError(f"Invalid shard spec {spec!r}, expected 'i/N'")
+
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {index}")
+
+    return index, count
+
+
+def shard_for(ticker: str, shard_count: int) -> int:
+    """
+    Deterministically assign a ticker to a shard.
+
+    Uses a content hash rather than hash(), which is salted per process,
+    so every worker on every machine agrees on the assignment.
+    """
+    digest = hashlib.md5(ticker.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def select_shard_etfs(
+    tracked_etfs: dict[str, list[str]], shard_index: int, shard_count: int
+) -> dict[str, list[str]]:
+    """Select the ETFs assigned to a shard, keeping the provider grouping."""
+    selected = {}
+    for provider, etf_list in tracked_etfs.items():
+        tickers = [t for t in etf_list if shard_for(t, shard_count) == shard_index]
+        if tickers:
+            selected[provider] = tickers
+    return selected
+
+
+def get_shard_dir(shard_index: int, shard_count: int) -> Path:
+    """Get the directory holding a shard's partial outputs."""
+    return Path(__file__).parent / SHARD_DIR / f"{shard_index}-of-{shard_count}"
+
+
+def load_shard_holdings(shard_count: int) -> pd.DataFrame:
+    """Load and combine the partial holdings written by every shard."""
+    import pandas as pd
+
+    frames = []
+    for shard_index in range(shard_count):
+        path = get_shard_dir(shard_index, shard_count) / "holdings.csv"
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Shard {shard_index}/{shard_count} has no holdings yet: {path}"
+            )
+        frames.append(read_csv_output(path))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def collect_shard_holdings(shard_index: int, shard_count: int) -> None:
+    """Fetch the funds assigned to a shard and write its partial holdings."""
+    tracked_etfs = select_shard_etfs(TRACKED_ETFS, shard_index, shard_count)
+    holdings_df, funds_df = fetch_all_holdings(tracked_etfs)
+
+    shard_dir = get_shard_dir(shard_index, shard_count)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\nWriting shard {shard_index}/{shard_count} holdings to {shard_dir}...")
+    _write_csv(holdings_df, shard_dir / "holdings.csv", HOLDINGS_COLUMNS)
+    _write_csv(funds_df, shard_dir / "funds.csv", FUNDS_COLUMNS)
+
+
+def enrich_shard_stocks(shard_index: int, shard_count: int) -> None:
+    """
+    Enrich the stock tickers assigned to a shard.
+
+    Tickers are assigned from the combined holdings of all shards, so each
+    stock is looked up exactly once no matter how many funds hold it.
+    """
+    holdings_df = load_shard_holdings(shard_count)
+    stocks_df = extract_unique_stocks(holdings_df)
+    in_shard = stocks_df["ticker"].map(lambda t: shard_for(t, shard_count))
+    stocks_df = stocks_df[in_shard == shard_index]
+
+    print(f"Shard {shard_index}/{shard_count} stock tickers: {len(stocks_df)}")
+    stocks_df = enrich_stocks(stocks_df)
+
+    shard_dir = get_shard_dir(shard_index, shard_count)
+    print(f"\nWriting shard {shard_index}/{shard_count} stocks to {shard_dir}...")
+    _write_csv(stocks_df, shard_dir / "stocks.csv", STOCKS_COLUMNS)
+
+
+def merge_shards(shard_count: int) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Combine the partial outputs of all shards.
+
+    Holdings and funds are ordered as in TRACKED_ETFS and stocks by ticker,
+    so the result does not depend on which worker finished first.
+
+    Returns:
+        tuple: (holdings_df, stocks_df, funds_df)
+
+    Raises:
+        FileNotFoundError: if a shard has not written all its outputs
+        ValueError: if held stocks are missing from every shard's stocks,
+            e.g. because enrichment ran before all shards had fetched
+    """
+    import pandas as pd
+
+    holdings_frames, stocks_frames, funds_frames = [], [], []
+    for shard_index in range(shard_count):
+        shard_dir = get_shard_dir(shard_index, shard_count)
+        for name, frames in (
+            ("holdings.csv", holdings_frames),
+            ("stocks.csv", stocks_frames),
+            ("funds.csv", funds_frames),
+        ):
+            path = shard_dir / name
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"Shard {shard_index}/{shard_count} is incomplete: {path}"
+                )
+            frames.append(read_csv_output(path))
+
+    fund_order = {
+        ticker: position
+        for position, ticker in enumerate(
+            t for etf_list in TRACKED_ETFS.values() for t in etf_list
+        )
+    }
+
+    funds_df = pd.concat(funds_frames, ignore_index=True)
+    funds_df = funds_df.drop_duplicates(subset="ticker", keep="last")
+    funds_df = funds_df.sort_values(
+        "ticker", key=lambda s: s.map(fund_order).fillna(len(fund_order)), kind="stable"
+    ).reset_index(drop=True)
+
+    holdings_df = pd.concat(holdings_frames, ignore_index=True)
+    holdings_df = holdings_df.sort_values(
         "fund_ticker",
-        "fund_name",
-        "provider",
-        "as_of_date",
-        "stock_ticker",
-        "stock_name",
-        "cusip",
-        "isin",
-        "weight",
-        "shares",
-        "market_value",
-    ]
-    holdings_out = holdings_df[[c for c in holdings_cols if c in holdings_df.columns]]
-    holdings_out.to_csv(holdings_path, index=False, encoding="utf-8")
-    print(f"✓ {holdings_path.name} ({len(holdings_out)} rows)")
-
-    # Stocks CSV
-    stocks_path = output_dir / "stocks.csv"
-    stocks_cols = [
-        "ticker",
-        "name",
-        "cusip",
-        "isin",
-        "sector",
-        "industry",
-        "market_cap",
-        "exchange",
-    ]
-    stocks_out = stocks_df[[c for c in stocks_cols if c in stocks_df.columns]]
-    stocks_out.to_csv(stocks_path, index=False, encoding="utf-8")
-    print(f"✓ {stocks_path.name} ({len(stocks_out)} rows)")
-
-    # Funds CSV
-    funds_path = output_dir / "funds.csv"
-    funds_cols = [
-        "ticker",
-        "name",
-        "provider",
-        "total_holdings",
-        "as_of_date",
-        "collected_at",
-    ]
-    funds_out = funds_df[[c for c in funds_cols if c in funds_df.columns]]
-    funds_out.to_csv(funds_path, index=False, encoding="utf-8")
-    print(f"✓ {funds_path.name} ({len(funds_out)} rows)")
+        key=lambda s: s.map(fund_order).fillna(len(fund_order)),
+        kind="stable",
+    ).reset_index(drop=True)
+
+    # A stock should only be enriched by one shard, but prefer enriched rows
+    # in case stale partials from an earlier run overlap
+    stocks_df = pd.concat(stocks_frames, ignore_index=True)
+    stocks_df = (
+        stocks_df.assign(_enriched=stocks_df["sector"].notna())
+        .sort_values(["ticker", "_enriched"], ascending=[True, False], kind="stable")
+        .drop_duplicates(subset="ticker", keep="first")
+        .drop(columns="_enriched")
+        .reset_index(drop=True)
+    )
+
+    missing = sorted(
+        set(holdings_df["stock_ticker"].dropna()) - set(stocks_df["ticker"])
+    )
+    if missing:
+        shown = ", ".join(missing[:20]) + (", ..." if len(missing) > 20 else "")
+        raise ValueError(
+            f"{len(missing)} held stocks were not enriched by any shard "
+            f"(rerun enrich once every shard has fetched): {shown}"
+        )
+
+    return holdings_df, stocks_df, funds_df
 
 
 # ============================================================================
@@ -407,8 +712,8 @@ def write_csv_files(
 # ============================================================================
 
 
-def main():
-    """Main entry point."""
+def run_collection(force: bool = False) -> int:
+    """Run the full collection in a single process."""
 
     start_time = time.time()
 
@@ -421,19 +726,23 @@ def main():
 
     if holdings_df.empty:
         print("\nNo holdings collected. Exiting.")
-        return
+        return 1
 
     print(f"\nHoldings collected: {len(funds_df)} funds")
     print(f"Total holdings rows: {len(holdings_df)}")
 
-    # Step 2: Extract unique stocks
+    # Step 2: Validate before spending time on enrichment
+    if not check_publishable(holdings_df, funds_df, force):
+        return 1
+
+    # Step 3: Extract unique stocks
     stocks_df = extract_unique_stocks(holdings_df)
     print(f"Unique stock tickers: {len(stocks_df)}")
 
-    # Step 3: Enrich with sector/industry
+    # Step 4: Enrich with sector/industry
     stocks_df = enrich_stocks(stocks_df)
 
-    # Step 4: Write CSVs
+    # Step 5: Write CSVs
     write_csv_files(holdings_df, stocks_df, funds_df)
 
     # Summary
@@ -442,7 +751,218 @@ def main():
     seconds = int(elapsed % 60)
 
     print(f"\nDone! Collection completed in {minutes}m {seconds}s")
+    return 0
+
+
+def load_outputs(
+    output_dir: Path | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Load the canonical CSV files.
+
+    Returns:
+        tuple: (holdings_df, stocks_df, funds_df)
+    """
+    if output_dir is None:
+        output_dir = get_output_dir()
+
+    return (
+        read_csv_output(output_dir / "holdings.csv"),
+        read_csv_output(output_dir / "stocks.csv"),
+        read_csv_output(output_dir / "funds.csv"),
+    )
+
+
+def missing_outputs(output_dir: Path | None = None) -> list[str]:
+    """Describe each canonical CSV file that has not been written yet."""
+    if output_dir is None:
+        output_dir = get_output_dir()
+
+    return [
+        f"{name} not found in {output_dir}; run the collection first"
+        for name in ("holdings.csv", "stocks.csv", "funds.csv")
+        if not (output_dir / name).exists()
+    ]
+
+
+def print_stats(
+    holdings_df: pd.DataFrame, stocks_df: pd.DataFrame, funds_df: pd.DataFrame
+):
+    """Print a summary of the collected data."""
+    enriched = stocks_df["sector"].notna().sum() if "sector" in stocks_df else 0
+
+    print(f"Funds: {len(funds_df)}")
+    print(f"Holdings rows: {len(holdings_df)}")
+    print(f"Unique stocks: {len(stocks_df)}")
+    print(f"Stocks with sector data: {enriched}/{len(stocks_df)}")
+
+    if not holdings_df.empty:
+        print("\nHoldings by provider:")
+        for provider, count in holdings_df.groupby("provider").size().items():
+            print(f"  {provider}: {count}")
+
+
+def check_outputs(
+    holdings_df: pd.DataFrame, stocks_df: pd.DataFrame, funds_df: pd.DataFrame
+) -> list[str]:
+    """Check the CSV files are consistent with each other and the schema."""
+    problems = []
+
+    for name, df, columns in (
+        ("holdings.csv", holdings_df, HOLDINGS_COLUMNS),
+        ("stocks.csv", stocks_df, STOCKS_COLUMNS),
+        ("funds.csv", funds_df, FUNDS_COLUMNS),
+    ):
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            problems.append(f"{name} is missing columns: {', '.join(missing)}")
+    if problems:
+        return problems
+
+    unknown_funds = set(holdings_df["fund_ticker"]) - set(funds_df["ticker"])
+    if unknown_funds:
+        problems.append(
+            f"holdings.csv references funds not in funds.csv: "
+            f"{', '.join(sorted(unknown_funds))}"
+        )
+
+    unknown_stocks = set(holdings_df["stock_ticker"].dropna()) - set(
+        stocks_df["ticker"]
+    )
+    if unknown_stocks:
+        problems.append(
+            f"holdings.csv references {len(unknown_stocks)} stocks not in stocks.csv"
+        )
+
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Main entry point."""
+
+    parser = argparse.ArgumentParser(
+        description="Collect ETF holdings and write CSV files. "
+        "Runs the full collection when no command is given."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="publish even if validation fails",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    fetch_parser = commands.add_parser(
+        "fetch", help="fetch fund holdings into the shard directory"
+    )
+    enrich_parser = commands.add_parser(
+        "enrich", help="enrich stocks once every shard has fetched"
+    )
+    for shard_parser in (fetch_parser, enrich_parser):
+        shard_parser.add_argument(
+            "--shard",
+            metavar="I/N",
+            default="0/1",
+            help="run as worker I of N (default: 0/1, a single worker)",
+        )
+
+    write_parser = commands.add_parser(
+        "write", help="merge shard outputs into the canonical CSV files"
+    )
+    write_parser.add_argument(
+        "--shards",
+        type=int,
+        metavar="N",
+        default=1,
+        help="number of shards to merge (default: 1)",
+    )
+    # SUPPRESS keeps `collect.py --force write` from being reset to False
+    write_parser.add_argument(
+        "--force",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="publish even if validation fails",
+    )
+
+    commands.add_parser("stats", help="summarize the canonical CSV files")
+
+    validate_parser = commands.add_parser(
+        "validate", help="check the canonical CSV files"
+    )
+    validate_parser.add_argument(
+        "--previous",
+        type=Path,
+        metavar="PATH",
+        help="earlier funds.csv to compare holdings counts against",
+    )
+    validate_parser.add_argument(
+        "--report",
+        type=Path,
+        metavar="PATH",
+        help="write the per-fund validation report to this CSV file",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command in ("fetch", "enrich"):
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.command == "fetch":
+            collect_shard_holdings(shard_index, shard_count)
+        else:
+            enrich_shard_stocks(shard_index, shard_count)
+
+    elif args.command == "write":
+        if args.shards < 1:
+            parser.error("--shards needs at least one shard")
+        try:
+            holdings_df, stocks_df, funds_df = merge_shards(args.shards)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"✗ {e}")
+            return 1
+        print(f"Merged {args.shards} shards: {len(funds_df)} funds")
+        if not publish_csv_files(holdings_df, stocks_df, funds_df, args.force):
+            return 1
+
+    elif args.command == "stats":
+        problems = missing_outputs()
+        for problem in problems:
+            print(f"✗ {problem}")
+        if problems:
+            return 1
+        print_stats(*load_outputs())
+
+    elif args.command == "validate":
+        from validate import report_problems, validate_holdings
+
+        problems = missing_outputs()
+        if args.previous and not args.previous.exists():
+            problems.append(f"{args.previous} not found")
+        if not problems:
+            holdings_df, stocks_df, funds_df = load_outputs()
+            problems = check_outputs(holdings_df, stocks_df, funds_df)
+        if not problems:
+            previous_funds_df = (
+                read_csv_output(args.previous) if args.previous else None
+            )
+            report = validate_holdings(holdings_df, funds_df, previous_funds_df)
+            problems = report_problems(report)
+            if args.report:
+                report.to_csv(args.report, encoding="utf-8")
+                print(f"✓ {args.report.name} ({len(report)} rows)")
+
+        for problem in problems:
+            print(f"✗ {problem}")
+        if problems:
+            return 1
+        print("✓ CSV files passed validation")
+
+    else:
+        return run_collection(args.force)
+
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
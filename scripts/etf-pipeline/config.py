@@ -40,3 +40,14 @@ TRACKED_ETFS = {
 
 # Output directory (relative to Next.js project root)
 OUTPUT_DIR = "../../lib/data"
+
+# Partial outputs written by shard workers (relative to this directory)
+SHARD_DIR = "shards"
+
+# Memory-mapped query index built by query.py (relative to this directory)
+INDEX_DIR = "index"
+
+# Data-quality thresholds checked before publishing (weights are percentages)
+WEIGHT_SUM_RANGE = (90.0, 105.0)  # Allowed range for each fund's weight sum
+MAX_HOLDINGS_DROP = 0.2  # Largest allowed fall in holdings count vs. last run
+FRACTION_WEIGHT_SUM_MAX = 1.5  # Weight sums up to this are fractions, not percent
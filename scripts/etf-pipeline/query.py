@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+ETF Holdings Query Library
+
+Builds a sorted, binary index from the CSV files written by collect.py and
+answers holdings queries against it through read-only memory maps, so any
+number of threads or processes can share one copy of the data. Also serves
+the queries over HTTP for the Next.js app.
+
+Usage:
+    python query.py build
+    python query.py serve [--port 8765]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from collect import (
+    FUNDS_COLUMNS,
+    HOLDINGS_COLUMNS,
+    STOCKS_COLUMNS,
+    get_output_dir,
+    normalize_ticker,
+    read_csv_output,
+)
+from config import INDEX_DIR
+
+# Index layout: one .npy file per array. Holdings are stored twice, once
+# sorted by fund and once by stock, with CSR-style offsets so each fund's
+# holdings (or each stock's holders) are a contiguous slice, heaviest first.
+INDEX_ARRAYS = [
+    "fund_tickers",
+    "fund_names",
+    "stock_tickers",
+    "stock_names",
+    "stock_sectors",
+    "sectors",
+    "by_fund_offsets",
+    "by_fund_stocks",
+    "by_fund_weights",
+    "by_stock_offsets",
+    "by_stock_funds",
+    "by_stock_weights",
+]
+
+UNKNOWN_SECTOR = "Unknown"
+
+# Each build is written to its own directory under builds/, then published by
+# atomically replacing the CURRENT pointer file with the build's name
+INDEX_POINTER = "CURRENT"
+INDEX_BUILDS = "builds"
+KEEP_BUILDS = 2
+
+
+def get_index_dir() -> Path:
+    """Get the index directory (relative to this script)."""
+    return Path(__file__).parent / INDEX_DIR
+
+
+def read_index_version(index_dir: Path) -> str:
+    """Read the name of the build the index currently points to."""
+    pointer = Path(index_dir) / INDEX_POINTER
+    try:
+        return pointer.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"No index in {index_dir}; run `python query.py build`"
+        ) from None
+
+
+# ============================================================================
+# Index Building
+# ============================================================================
+
+
+def _is_missing(value) -> bool:
+    """Check for the None/NaN that pandas uses for empty cells."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _encode(values) -> np.ndarray:
+    """Encode values as a fixed-width UTF-8 byte array; missing values are empty."""
+    return np.array(
+        [b"" if _is_missing(v) else str(v).encode("utf-8") for v in values],
+        dtype="S",
+    )
+
+
+def _group(
+    keys: np.ndarray, values: np.ndarray, weights: np.ndarray, key_count: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort rows by key, then weight descending, and compute CSR offsets."""
+    order = np.lexsort((-weights, keys))
+    counts = np.bincount(keys, minlength=key_count)
+    offsets = np.zeros(key_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, values[order], weights[order]
+
+
+def build_index(data_dir: Path | None = None, index_dir: Path | None = None) -> Path:
+    """
+    Build the binary index from holdings.csv, stocks.csv and funds.csv.
+
+    Each build goes to a new directory and is published by atomically
+    replacing the CURRENT pointer, so a reader resolving the pointer always
+    gets a complete build. The previous build is kept for readers that
+    resolved the pointer just before the swap; older builds are removed.
+
+    Returns:
+        Path: the index directory
+    """
+    if data_dir is None:
+        data_dir = get_output_dir()
+    if index_dir is None:
+        index_dir = get_index_dir()
+
+    # Optional columns may be absent from the CSV files
+    holdings_df = read_csv_output(data_dir / "holdings.csv").reindex(
+        columns=HOLDINGS_COLUMNS
+    )
+    stocks_df = read_csv_output(data_dir / "stocks.csv").reindex(columns=STOCKS_COLUMNS)
+    funds_df = read_csv_output(data_dir / "funds.csv").reindex(columns=FUNDS_COLUMNS)
+
+    holdings_df = holdings_df[
+        holdings_df["fund_ticker"].notna() & holdings_df["stock_ticker"].notna()
+    ]
+
+    # Ticker tables are sorted so lookups are a binary search
+    fund_tickers = np.unique(
+        _encode(list(funds_df["ticker"].dropna()) + list(holdings_df["fund_ticker"]))
+    )
+    stock_tickers = np.unique(
+        _encode(
+            list(stocks_df["ticker"].dropna()) + list(holdings_df["stock_ticker"])
+        )
+    )
+
+    fund_ids = np.searchsorted(fund_tickers, _encode(holdings_df["fund_ticker"]))
+    stock_ids = np.searchsorted(stock_tickers, _encode(holdings_df["stock_ticker"]))
+    weights = np.nan_to_num(holdings_df["weight"].to_numpy(dtype=np.float64))
+
+    fund_name_lookup = dict(zip(funds_df["ticker"], funds_df["name"]))
+    fund_names = _encode(
+        fund_name_lookup.get(t.decode("utf-8")) for t in fund_tickers
+    )
+
+    stocks_df = stocks_df.drop_duplicates(subset="ticker").set_index("ticker")
+    stock_keys = [t.decode("utf-8") for t in stock_tickers]
+    holding_names = holdings_df.drop_duplicates(subset="stock_ticker").set_index(
+        "stock_ticker"
+    )["stock_name"]
+    stock_names = _encode(
+        stocks_df["name"].reindex(stock_keys).fillna(holding_names.reindex(stock_keys))
+    )
+
+    sector_values = stocks_df["sector"].reindex(stock_keys).fillna(UNKNOWN_SECTOR)
+    sectors, stock_sectors = np.unique(_encode(sector_values), return_inverse=True)
+
+    by_fund_offsets, by_fund_stocks, by_fund_weights = _group(
+        fund_ids, stock_ids.astype(np.int32), weights, len(fund_tickers)
+    )
+    by_stock_offsets, by_stock_funds, by_stock_weights = _group(
+        stock_ids, fund_ids.astype(np.int32), weights, len(stock_tickers)
+    )
+
+    arrays = {
+        "fund_tickers": fund_tickers,
+        "fund_names": fund_names,
+        "stock_tickers": stock_tickers,
+        "stock_names": stock_names,
+        "stock_sectors": stock_sectors.astype(np.int32),
+        "sectors": sectors,
+        "by_fund_offsets": by_fund_offsets,
+        "by_fund_stocks": by_fund_stocks,
+        "by_fund_weights": by_fund_weights,
+        "by_stock_offsets": by_stock_offsets,
+        "by_stock_funds": by_stock_funds,
+        "by_stock_weights": by_stock_weights,
+    }
+
+    version = f"{time.time_ns():020d}-{os.getpid()}"
+    builds_dir = index_dir / INDEX_BUILDS
+    build_dir = builds_dir / version
+    build_dir.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(build_dir / f"{name}.npy", array)
+
+    pointer_tmp = index_dir / f"{INDEX_POINTER}.{version}.tmp"
+    pointer_tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(pointer_tmp, index_dir / INDEX_POINTER)
+
+    # Readers that already mapped a removed build keep it until they reopen
+    builds = sorted(p for p in builds_dir.iterdir() if p.is_dir())
+    for old_build in builds[:-KEEP_BUILDS]:
+        if old_build.name != version:
+            shutil.rmtree(old_build, ignore_errors=True)
+
+    print(
+        f"✓ Indexed {len(weights)} holdings, {len(fund_tickers)} funds, "
+        f"{len(stock_tickers)} stocks into {index_dir}"
+    )
+
+    return index_dir
+
+
+# ============================================================================
+# Queries
+# ============================================================================
+
+
+class HoldingsIndex:
+    """
+    Read-only view of a built index.
+
+    Arrays are memory-mapped, so opening is cheap and the data lives in the
+    OS page cache shared by every reader. The CURRENT pointer is resolved
+    once, so every array comes from the same build; open a new instance to
+    pick up a rebuild. Instances are safe to use from multiple threads.
+    """
+
+    def __init__(self, index_dir: Path | None = None):
+        if index_dir is None:
+            index_dir = get_index_dir()
+
+        self.index_dir = Path(index_dir)
+        self.version = read_index_version(self.index_dir)
+        build_dir = self.index_dir / INDEX_BUILDS / self.version
+
+        for name in INDEX_ARRAYS:
+            path = build_dir / f"{name}.npy"
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"Index is missing {path.name}; run `python query.py build`"
+                )
+            # A plain ndarray view of the map avoids np.memmap's per-slice
+            # overhead without copying the data
+            setattr(self, name, np.asarray(np.load(path, mmap_mode="r")))
+
+    @staticmethod
+    def _find(table: np.ndarray, ticker: str) -> int:
+        """Binary-search a sorted ticker table."""
+        normalized = normalize_ticker(ticker)
+        if normalized is None:
+            raise KeyError(ticker)
+
+        key = normalized.encode("utf-8")
+        position = int(np.searchsorted(table, key))
+        if position >= len(table) or table[position] != key:
+            raise KeyError(ticker)
+        return position
+
+    def _portfolio_exposure(self, portfolio: dict[str, float]) -> np.ndarray:
+        """Dollar exposure to every stock for a fund → amount portfolio."""
+        stock_ids, exposures = [], []
+        for fund, amount in portfolio.items():
+            fund_id = self._find(self.fund_tickers, fund)
+            start, end = self.by_fund_offsets[fund_id : fund_id + 2]
+            stock_ids.append(self.by_fund_stocks[start:end])
+            exposures.append(self.by_fund_weights[start:end] * (amount / 100))
+
+        if not stock_ids:
+            return np.zeros(len(self.stock_tickers))
+
+        return np.bincount(
+            np.concatenate(stock_ids),
+            weights=np.concatenate(exposures),
+            minlength=len(self.stock_tickers),
+        )
+
+    def fund_holdings(self, fund: str, limit: int | None = None) -> list[dict]:
+        """
+        List a fund's holdings, heaviest first.
+
+        Raises:
+            KeyError: if the fund is not in the index
+        """
+        fund_id = self._find(self.fund_tickers, fund)
+        start, end = self.by_fund_offsets[fund_id : fund_id + 2]
+        if limit is not None:
+            end = min(end, start + limit)
+
+        return [
+            {
+                "ticker": self.stock_tickers[stock_id].decode("utf-8"),
+                "name": self.stock_names[stock_id].decode("utf-8"),
+                "sector": self.sectors[self.stock_sectors[stock_id]].decode("utf-8"),
+                "weight": float(weight),
+            }
+            for stock_id, weight in zip(
+                self.by_fund_stocks[start:end], self.by_fund_weights[start:end]
+            )
+        ]
+
+    def stock_holders(self, stock: str) -> list[dict]:
+        """
+        List the funds holding a stock, heaviest weight first.
+
+        Raises:
+            KeyError: if the stock is not in the index
+        """
+        stock_id = self._find(self.stock_tickers, stock)
+        start, end = self.by_stock_offsets[stock_id : stock_id + 2]
+
+        return [
+            {
+                "ticker": self.fund_tickers[fund_id].decode("utf-8"),
+                "name": self.fund_names[fund_id].decode("utf-8"),
+                "weight": float(weight),
+            }
+            for fund_id, weight in zip(
+                self.by_stock_funds[start:end], self.by_stock_weights[start:end]
+            )
+        ]
+
+    def top_exposure(self, portfolio: dict[str, float], n: int = 10) -> list[dict]:
+        """
+        Find the stocks a portfolio is most exposed to through its funds.
+
+        Args:
+            portfolio: Fund ticker → dollar amount
+            n: Number of stocks to return
+
+        Raises:
+            KeyError: if a fund is not in the index
+        """
+        exposure = self._portfolio_exposure(portfolio)
+        n = min(n, np.count_nonzero(exposure > 0))
+        if n <= 0:
+            return []
+
+        # Take everything tied with the n-th largest exposure, then break
+        # ties by ticker so the result doesn't depend on partition order
+        nth = np.partition(exposure, len(exposure) - n)[len(exposure) - n]
+        candidates = np.flatnonzero(exposure >= nth)
+        top = candidates[np.lexsort((candidates, -exposure[candidates]))][:n]
+
+        return [
+            {
+                "ticker": self.stock_tickers[stock_id].decode("utf-8"),
+                "name": self.stock_names[stock_id].decode("utf-8"),
+                "exposure": float(exposure[stock_id]),
+            }
+            for stock_id in top
+        ]
+
+    def sector_breakdown(self, portfolio: dict[str, float]) -> list[dict]:
+        """
+        Total a portfolio's exposure by sector, largest first.
+
+        Raises:
+            KeyError: if a fund is not in the index
+        """
+        exposure = self._portfolio_exposure(portfolio)
+        by_sector = np.bincount(
+            self.stock_sectors, weights=exposure, minlength=len(self.sectors)
+        )
+        order = np.argsort(-by_sector, kind="stable")
+
+        return [
+            {
+                "sector": self.sectors[sector_id].decode("utf-8"),
+                "exposure": float(by_sector[sector_id]),
+            }
+            for sector_id in order
+            if by_sector[sector_id] > 0
+        ]
+
+
+# ============================================================================
+# HTTP Server
+# ============================================================================
+
+
+def parse_portfolio(spec: str) -> dict[str, float]:
+    """
+    Parse a portfolio of the form "IVV:1000,QQQ:500".
+
+    A fund without an amount counts as 100, so exposures read as percentages.
+
+    Raises:
+        ValueError: if no funds are given or an amount is not a positive number
+    """
+    portfolio = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        fund, _, amount = item.partition(":")
+        try:
+            value = float(amount) if amount.strip() else 100.0
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value) or value <= 0:
+            raise ValueError(
+                f"Amount for {fund.strip()} must be a positive number, got {amount!r}"
+            )
+        portfolio[fund.strip()] = value
+    if not portfolio:
+        raise ValueError("No funds given")
+    return portfolio
+
+
+def parse_count(params: dict[str, str], name: str, default: int | None = None):
+    """
+    Parse a non-negative integer query parameter.
+
+    Raises:
+        ValueError: if the value is not a non-negative integer
+    """
+    if name not in params:
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise ValueError(f"{name} must be a non-negative integer, got {params[name]!r}")
+    return value
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints over the server's current HoldingsIndex:
+
+        GET /funds/<ticker>/holdings[?limit=N]
+        GET /stocks/<ticker>/holders
+        GET /exposure?funds=IVV:1000,QQQ:500[&n=10]
+        GET /sectors?funds=IVV:1000,QQQ:500
+    """
+
+    server: QueryServer
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        # One index per request, so a rebuild never mixes two builds
+        try:
+            index = self.server.current_index()
+        except (OSError, ValueError) as e:
+            self._send_json(503, {"error": f"Holdings index unavailable: {e}"})
+            return
+
+        try:
+            if len(parts) == 3 and parts[0] == "funds" and parts[2] == "holdings":
+                limit = parse_count(params, "limit")
+                body = {
+                    "ticker": parts[1].upper(),
+                    "holdings": index.fund_holdings(parts[1], limit),
+                }
+            elif len(parts) == 3 and parts[0] == "stocks" and parts[2] == "holders":
+                body = {
+                    "ticker": parts[1].upper(),
+                    "holders": index.stock_holders(parts[1]),
+                }
+            elif parts == ["exposure"]:
+                portfolio = parse_portfolio(params.get("funds", ""))
+                n = parse_count(params, "n", 10)
+                body = {"exposure": index.top_exposure(portfolio, n)}
+            elif parts == ["sectors"]:
+                portfolio = parse_portfolio(params.get("funds", ""))
+                body = {"sectors": index.sector_breakdown(portfolio)}
+            else:
+                self._send_json(404, {"error": f"Unknown path {url.path}"})
+                return
+        except KeyError as e:
+            self._send_json(404, {"error": f"Data for {e.args[0]} not found"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        self._send_json(200, body)
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; errors still go to stderr via log_error
+        pass
+
+
+class QueryServer(ThreadingHTTPServer):
+    """Threaded HTTP server that reopens the index when a new build is published."""
+
+    def __init__(self, address: tuple[str, int], index_dir: Path):
+        super().__init__(address, QueryHandler)
+        self.index_dir = Path(index_dir)
+        self._lock = threading.Lock()
+        read_index_version(self.index_dir)  # Fail clearly if never built
+        self._pointer_stat = self._stat_pointer()
+        self._index = HoldingsIndex(self.index_dir)
+
+    def _stat_pointer(self) -> tuple[int, int]:
+        """Identify the pointer file; replacing it changes the inode."""
+        stat = os.stat(self.index_dir / INDEX_POINTER)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def current_index(self) -> HoldingsIndex:
+        """Get the index, reopening it if the pointer has changed."""
+        pointer_stat = self._stat_pointer()
+        if pointer_stat != self._pointer_stat:
+            with self._lock:
+                if pointer_stat != self._pointer_stat:
+                    self._index = HoldingsIndex(self.index_dir)
+                    self._pointer_stat = pointer_stat
+        return self._index
+
+
+def make_server(
+    index_dir: Path | None = None, host: str = "127.0.0.1", port: int = 8765
+) -> QueryServer:
+    """Create a threaded HTTP server answering queries from an index."""
+    if index_dir is None:
+        index_dir = get_index_dir()
+    return QueryServer((host, port), index_dir)
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Main entry point."""
+
+    parser = argparse.ArgumentParser(description="Query the ETF holdings index.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    commands.add_parser("build", help="build the index from the CSV files")
+
+    serve_parser = commands.add_parser("serve", help="serve queries over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build_index()
+    elif args.command == "serve":
+        server = make_server(host=args.host, port=args.port)
+        print(f"Serving holdings queries on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
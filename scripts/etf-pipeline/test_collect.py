@@ -4,6 +4,8 @@ Tests for ETF Holdings Collection Script
 """
 
 import os
+import subprocess
+import sys
 import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -16,6 +18,23 @@ from collect import (
     is_equity_ticker,
     normalize_holdings_df,
     extract_unique_stocks,
+    parse_shard,
+    shard_for,
+    select_shard_etfs,
+    write_csv_files,
+    read_csv_output,
+    merge_shards,
+    get_shard_dir,
+    collect_shard_holdings,
+    enrich_shard_stocks,
+    fetch_all_holdings,
+    enrich_stocks,
+    check_outputs,
+    publish_csv_files,
+    main,
+    HOLDINGS_COLUMNS,
+    STOCKS_COLUMNS,
+    FUNDS_COLUMNS,
 )
 
 
@@ -121,6 +140,34 @@ class TestHoldingsNormalization:
         assert "BRK-B" in result["stock_ticker"].values
         assert "AAPL" in result["stock_ticker"].values
 
+    def test_fraction_weights_converted_to_percent(self):
+        """Weights reported as fractions should be stored as percentages."""
+        input_df = pd.DataFrame(
+            {
+                "ticker": ["AAPL", "MSFT"],
+                "name": ["Apple", "Microsoft"],
+                "weight": [0.6, 0.4],
+            }
+        )
+
+        result = normalize_holdings_df(input_df, "ssga", "SPY")
+
+        assert list(result["weight"]) == pytest.approx([60.0, 40.0])
+
+    def test_percent_weights_unchanged(self):
+        """Percentage weights should be kept as-is."""
+        input_df = pd.DataFrame(
+            {
+                "ticker": ["AAPL", "MSFT"],
+                "name": ["Apple", "Microsoft"],
+                "weight": [0.6, 99.4],
+            }
+        )
+
+        result = normalize_holdings_df(input_df, "ishares", "IVV")
+
+        assert list(result["weight"]) == pytest.approx([0.6, 99.4])
+
 
 class TestExtractUniqueStocks:
     """Tests for extracting unique stocks."""
@@ -209,7 +256,7 @@ class TestCSVOutputFormat:
 class TestStockEnrichment:
     """Tests for stock enrichment with mocked yfinance."""
 
-    @patch("collect.yf.Ticker")
+    @patch("yfinance.Ticker")
     def test_enrichment_populates_sector_industry(self, mock_ticker_class):
         """Should populate sector and industry from yfinance."""
         # Mock yfinance
@@ -231,7 +278,7 @@ class TestStockEnrichment:
         assert result["market_cap"] == 3000000000000
         assert result["exchange"] == "NASDAQ"
 
-    @patch("collect.yf.Ticker")
+    @patch("yfinance.Ticker")
     def test_enrichment_handles_missing_data(self, mock_ticker_class):
         """Should handle missing data gracefully."""
         # Mock yfinance returning empty info
@@ -247,5 +294,313 @@ class TestStockEnrichment:
         assert result["industry"] is None
 
 
+class TestSharding:
+    """Tests for shard assignment."""
+
+    def test_parse_shard(self):
+        """Shard specs should parse into (index, count)."""
+        assert parse_shard("0/4") == (0, 4)
+        assert parse_shard(" 3 / 4 ") == (3, 4)
+
+    def test_parse_shard_rejects_invalid(self):
+        """Malformed or out-of-range specs should be rejected."""
+        for spec in ["", "4", "4/4", "1/0", "-1/4", "a/b"]:
+            with pytest.raises(ValueError):
+                parse_shard(spec)
+
+    def test_assignment_is_deterministic(self):
+        """The same ticker should always map to the same shard."""
+        assert shard_for("IVV", 8) == shard_for("IVV", 8)
+        assert 0 <= shard_for("IVV", 8) < 8
+        assert shard_for("IVV", 1) == 0
+
+    def test_shards_partition_etfs(self):
+        """Every ETF should land in exactly one shard."""
+        tracked = {"ishares": ["IVV", "IWM", "IJH"], "vanguard": ["VOO", "VTI"]}
+        shards = [select_shard_etfs(tracked, i, 3) for i in range(3)]
+
+        selected = [t for shard in shards for etfs in shard.values() for t in etfs]
+        assert sorted(selected) == sorted(["IVV", "IWM", "IJH", "VOO", "VTI"])
+
+
+class TestMergeShards:
+    """Tests for merging shard outputs."""
+
+    def _write_shard(self, shard_index, shard_count, holdings, stocks, funds):
+        write_csv_files(
+            pd.DataFrame(holdings),
+            pd.DataFrame(stocks),
+            pd.DataFrame(funds),
+            output_dir=get_shard_dir(shard_index, shard_count),
+        )
+
+    def test_merge_orders_and_deduplicates(self, tmp_path, monkeypatch):
+        """Merging should follow TRACKED_ETFS order and dedupe stocks."""
+        monkeypatch.setattr("collect.SHARD_DIR", str(tmp_path))
+        monkeypatch.setattr(
+            "collect.TRACKED_ETFS", {"ishares": ["IVV"], "vanguard": ["VOO"]}
+        )
+
+        self._write_shard(
+            0,
+            2,
+            {"fund_ticker": ["VOO"], "stock_ticker": ["AAPL"], "weight": [7.0]},
+            {"ticker": ["AAPL"], "cusip": ["037833100"], "sector": [None]},
+            {"ticker": ["VOO"], "provider": ["vanguard"]},
+        )
+        self._write_shard(
+            1,
+            2,
+            {"fund_ticker": ["IVV"], "stock_ticker": ["AAPL"], "weight": [7.1]},
+            {"ticker": ["AAPL"], "cusip": ["037833100"], "sector": ["Technology"]},
+            {"ticker": ["IVV"], "provider": ["ishares"]},
+        )
+
+        holdings_df, stocks_df, funds_df = merge_shards(2)
+
+        assert list(funds_df["ticker"]) == ["IVV", "VOO"]
+        assert list(holdings_df["fund_ticker"]) == ["IVV", "VOO"]
+        assert len(stocks_df) == 1
+        assert stocks_df["sector"].iloc[0] == "Technology"
+        assert stocks_df["cusip"].iloc[0] == "037833100"
+
+    def test_merge_rejects_unenriched_stocks(self, tmp_path, monkeypatch):
+        """Merging should fail if a held stock is missing from stocks."""
+        monkeypatch.setattr("collect.SHARD_DIR", str(tmp_path))
+        self._write_shard(
+            0,
+            1,
+            {"fund_ticker": ["IVV", "IVV"], "stock_ticker": ["AAPL", "7203"]},
+            {"ticker": ["AAPL"], "sector": ["Technology"]},
+            {"ticker": ["IVV"]},
+        )
+
+        with pytest.raises(ValueError, match="7203"):
+            merge_shards(1)
+
+    def test_numeric_tickers_round_trip(self, tmp_path):
+        """Numeric tickers should be read back as strings, zeros and all."""
+        write_csv_files(
+            pd.DataFrame({"fund_ticker": ["IEMG"], "stock_ticker": ["005930"]}),
+            pd.DataFrame({"ticker": ["005930"]}),
+            pd.DataFrame({"ticker": ["IEMG"]}),
+            tmp_path,
+        )
+
+        assert read_csv_output(tmp_path / "holdings.csv")["stock_ticker"][0] == "005930"
+        assert read_csv_output(tmp_path / "stocks.csv")["ticker"][0] == "005930"
+
+    def test_merge_requires_all_shards(self, tmp_path, monkeypatch):
+        """Merging should fail if a shard has not written its outputs."""
+        monkeypatch.setattr("collect.SHARD_DIR", str(tmp_path))
+        self._write_shard(
+            0,
+            2,
+            {"fund_ticker": ["IVV"], "stock_ticker": ["AAPL"]},
+            {"ticker": ["AAPL"]},
+            {"ticker": ["IVV"]},
+        )
+
+        with pytest.raises(FileNotFoundError):
+            merge_shards(2)
+
+    def test_empty_shard_round_trips(self, tmp_path):
+        """Empty partial outputs should still be readable."""
+        write_csv_files(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), tmp_path)
+
+        result = read_csv_output(tmp_path / "holdings.csv")
+
+        assert result.empty
+        assert "fund_ticker" in result.columns
+
+
+class TestShardedCollection:
+    """End-to-end tests for sharded fetch, enrich and merge."""
+
+    FAKE_HOLDINGS = {
+        "IVV": ["AAPL", "MSFT", "XOM"],
+        "VOO": ["AAPL", "MSFT", "JNJ"],
+        "QQQ": ["AAPL", "NVDA"],
+        "XLE": ["XOM", "CVX", "005930"],
+        "XLK": ["AAPL", "MSFT", "NVDA", "AVGO"],
+    }
+
+    @pytest.fixture
+    def fake_sources(self, tmp_path, monkeypatch):
+        """Mock the providers and count enrichment lookups per ticker."""
+        monkeypatch.setattr("collect.SHARD_DIR", str(tmp_path / "shards"))
+        monkeypatch.setattr(
+            "collect.TRACKED_ETFS",
+            {
+                "ishares": ["IVV"],
+                "vanguard": ["VOO"],
+                "ssga": ["XLE", "XLK"],
+                "invesco": ["QQQ"],
+            },
+        )
+        monkeypatch.setattr("collect.time.sleep", lambda seconds: None)
+
+        def fake_fetch_single_etf(ticker):
+            stocks = self.FAKE_HOLDINGS[ticker]
+            return pd.DataFrame(
+                {
+                    "ticker": stocks,
+                    "name": [f"{s} Inc" for s in stocks],
+                    "weight": [100 / len(stocks)] * len(stocks),
+                }
+            )
+
+        lookups = []
+
+        def fake_fetch_stock_info(ticker):
+            lookups.append(ticker)
+            return {
+                "sector": f"Sector {ticker[0]}",
+                "industry": None,
+                "market_cap": None,
+                "exchange": None,
+            }
+
+        monkeypatch.setattr("collect.fetch_single_etf", fake_fetch_single_etf)
+        monkeypatch.setattr("collect.fetch_stock_info", fake_fetch_stock_info)
+        return lookups
+
+    @pytest.mark.parametrize("shard_count", [2, 3])
+    def test_sharded_run_matches_single_process(
+        self, shard_count, fake_sources, tmp_path
+    ):
+        """Every stock is enriched once and the merge matches one process."""
+        for shard_index in range(shard_count):
+            collect_shard_holdings(shard_index, shard_count)
+        for shard_index in range(shard_count):
+            enrich_shard_stocks(shard_index, shard_count)
+        merged = merge_shards(shard_count)
+
+        all_stocks = {s for stocks in self.FAKE_HOLDINGS.values() for s in stocks}
+        assert sorted(fake_sources) == sorted(all_stocks)
+
+        # Round-trip the single-process result through CSV like the shards
+        holdings_df, funds_df = fetch_all_holdings()
+        stocks_df = enrich_stocks(extract_unique_stocks(holdings_df))
+        write_csv_files(holdings_df, stocks_df, funds_df, tmp_path / "single")
+        single = (
+            read_csv_output(tmp_path / "single" / "holdings.csv"),
+            read_csv_output(tmp_path / "single" / "stocks.csv"),
+            read_csv_output(tmp_path / "single" / "funds.csv"),
+        )
+
+        for merged_df, single_df in zip(merged, single):
+            pd.testing.assert_frame_equal(
+                merged_df.drop(columns="collected_at", errors="ignore"),
+                single_df.drop(columns="collected_at", errors="ignore"),
+                check_dtype=False,
+            )
+
+
+class TestCLI:
+    """Tests for the command-line entry point."""
+
+    def test_import_skips_heavy_dependencies(self):
+        """Importing the module should not load pandas or network libraries."""
+        heavy = ["pandas", "yfinance", "etf_scraper", "tenacity", "tqdm"]
+        code = (
+            "import sys, collect; "
+            f"print(','.join(m for m in {heavy!r} if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == ""
+
+    def test_validate_reports_inconsistent_outputs(self, tmp_path, monkeypatch):
+        """validate should fail when holdings reference unknown stocks."""
+        monkeypatch.setattr("collect.OUTPUT_DIR", str(tmp_path))
+        write_csv_files(
+            pd.DataFrame(
+                {"fund_ticker": ["IVV", "IVV"], "stock_ticker": ["AAPL", "MSFT"]}
+            ),
+            pd.DataFrame({"ticker": ["AAPL"], "sector": ["Technology"]}),
+            pd.DataFrame({"ticker": ["IVV"]}),
+        )
+
+        assert main(["validate"]) == 1
+
+    @pytest.mark.parametrize("command", ["stats", "validate"])
+    def test_missing_outputs_reported(self, command, tmp_path, monkeypatch, capsys):
+        """stats and validate should report missing CSV files, not crash."""
+        monkeypatch.setattr("collect.OUTPUT_DIR", str(tmp_path))
+
+        assert main([command]) == 1
+        assert "holdings.csv not found" in capsys.readouterr().out
+
+    def test_publish_blocked_by_failed_validation(self, tmp_path, monkeypatch):
+        """Failed validation should stop the CSV files being written."""
+        monkeypatch.setattr("collect.OUTPUT_DIR", str(tmp_path))
+        holdings_df = pd.DataFrame(
+            {"fund_ticker": ["IVV"], "stock_ticker": ["AAPL"], "weight": [40.0]}
+        )
+        stocks_df = pd.DataFrame({"ticker": ["AAPL"]})
+        funds_df = pd.DataFrame({"ticker": ["IVV"], "total_holdings": [1]})
+
+        assert not publish_csv_files(holdings_df, stocks_df, funds_df)
+        assert not (tmp_path / "holdings.csv").exists()
+
+        assert publish_csv_files(holdings_df, stocks_df, funds_df, force=True)
+        assert (tmp_path / "holdings.csv").exists()
+
+    @pytest.mark.parametrize("argv", [["--force", "write"], ["write", "--force"]])
+    def test_force_reaches_write(self, argv, monkeypatch):
+        """--force should apply to write wherever it is given."""
+        published = {}
+
+        def fake_publish(holdings_df, stocks_df, funds_df, force=False):
+            published["force"] = force
+            return True
+
+        monkeypatch.setattr(
+            "collect.merge_shards",
+            lambda shard_count: (pd.DataFrame(), pd.DataFrame(), pd.DataFrame()),
+        )
+        monkeypatch.setattr("collect.publish_csv_files", fake_publish)
+
+        main(argv)
+
+        assert published["force"] is True
+
+    def test_failed_validation_skips_enrichment(self, tmp_path, monkeypatch):
+        """A full run should stop before enrichment when validation fails."""
+        monkeypatch.setattr("collect.OUTPUT_DIR", str(tmp_path))
+        monkeypatch.setattr(
+            "collect.fetch_all_holdings",
+            lambda: (
+                pd.DataFrame(
+                    {"fund_ticker": ["IVV"], "stock_ticker": ["AAPL"], "weight": [40.0]}
+                ),
+                pd.DataFrame({"ticker": ["IVV"], "total_holdings": [1]}),
+            ),
+        )
+        enrich = MagicMock()
+        monkeypatch.setattr("collect.enrich_stocks", enrich)
+
+        assert main([]) == 1
+        enrich.assert_not_called()
+        assert not (tmp_path / "holdings.csv").exists()
+
+    def test_check_outputs_passes_consistent_data(self):
+        """Consistent outputs should produce no problems."""
+        holdings_df = pd.DataFrame(
+            [{**dict.fromkeys(HOLDINGS_COLUMNS), "fund_ticker": "IVV", "stock_ticker": "AAPL"}]
+        )
+        stocks_df = pd.DataFrame([{**dict.fromkeys(STOCKS_COLUMNS), "ticker": "AAPL"}])
+        funds_df = pd.DataFrame([{**dict.fromkeys(FUNDS_COLUMNS), "ticker": "IVV"}])
+
+        assert check_outputs(holdings_df, stocks_df, funds_df) == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
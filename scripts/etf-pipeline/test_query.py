@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Tests for the ETF Holdings Query Library
+"""
+
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+
+from collect import write_csv_files
+from query import (
+    INDEX_BUILDS,
+    INDEX_POINTER,
+    KEEP_BUILDS,
+    HoldingsIndex,
+    _encode,
+    build_index,
+    make_server,
+    parse_portfolio,
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Build an index over a small set of pipeline outputs."""
+    data_dir = tmp_path / "data"
+    write_csv_files(
+        pd.DataFrame(
+            {
+                "fund_ticker": ["IVV", "IVV", "IVV", "QQQ", "QQQ"],
+                "stock_ticker": ["AAPL", "MSFT", "XOM", "MSFT", "AAPL"],
+                "stock_name": ["Apple", "Microsoft", "Exxon", "Microsoft", "Apple"],
+                "weight": [7.0, 6.0, 1.0, 9.0, 8.0],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "ticker": ["AAPL", "MSFT", "XOM"],
+                "name": ["Apple Inc", "Microsoft Corp", "Exxon Mobil"],
+                "sector": ["Technology", "Technology", None],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "ticker": ["IVV", "QQQ"],
+                "name": ["iShares Core S&P 500 ETF", "Invesco QQQ Trust"],
+            }
+        ),
+        output_dir=data_dir,
+    )
+    return HoldingsIndex(build_index(data_dir, tmp_path / "index"))
+
+
+class TestHoldingsIndex:
+    """Tests for index queries."""
+
+    def test_fund_holdings_sorted_by_weight(self, index):
+        """A fund's holdings should be returned heaviest first."""
+        result = index.fund_holdings("ivv")
+
+        assert [h["ticker"] for h in result] == ["AAPL", "MSFT", "XOM"]
+        assert result[0]["name"] == "Apple Inc"
+        assert result[0]["sector"] == "Technology"
+        assert result[2]["sector"] == "Unknown"
+
+    def test_fund_holdings_limit(self, index):
+        """limit should cap the number of holdings returned."""
+        assert len(index.fund_holdings("IVV", limit=2)) == 2
+
+    def test_stock_holders(self, index):
+        """Should list every fund holding a stock."""
+        result = index.stock_holders("MSFT")
+
+        assert [h["ticker"] for h in result] == ["QQQ", "IVV"]
+        assert result[0]["name"] == "Invesco QQQ Trust"
+        assert [h["ticker"] for h in index.stock_holders("XOM")] == ["IVV"]
+
+    def test_unknown_ticker_raises(self, index):
+        """Unknown tickers should raise KeyError."""
+        with pytest.raises(KeyError):
+            index.fund_holdings("VOO")
+        with pytest.raises(KeyError):
+            index.stock_holders("ZZZZ")
+
+    def test_top_exposure(self, index):
+        """Exposure should combine holdings across funds."""
+        result = index.top_exposure({"IVV": 1000, "QQQ": 1000}, n=2)
+
+        assert [r["ticker"] for r in result] == ["AAPL", "MSFT"]
+        assert result[0]["exposure"] == pytest.approx(150.0)
+        assert result[1]["exposure"] == pytest.approx(150.0)
+
+    def test_top_exposure_breaks_ties_by_ticker(self, index):
+        """Tied exposures should be ordered by ticker, even at the cutoff."""
+        result = index.top_exposure({"IVV": 1000, "QQQ": 1000}, n=1)
+
+        assert [r["ticker"] for r in result] == ["AAPL"]
+
+    def test_negative_amounts_ignored(self, index):
+        """Only positive exposure should be reported."""
+        assert index.top_exposure({"IVV": -100}) == []
+        assert index.sector_breakdown({"IVV": -100}) == []
+
+    def test_sector_breakdown(self, index):
+        """Exposure should be totalled by sector."""
+        result = index.sector_breakdown({"IVV": 100})
+
+        assert result == [
+            {"sector": "Technology", "exposure": pytest.approx(13.0)},
+            {"sector": "Unknown", "exposure": pytest.approx(1.0)},
+        ]
+
+    def test_missing_index(self, tmp_path):
+        """Opening an unbuilt index should explain how to build it."""
+        with pytest.raises(FileNotFoundError):
+            HoldingsIndex(tmp_path)
+
+    def test_numeric_tickers_indexed(self, tmp_path):
+        """Numeric tickers should keep their own entries, not collapse to ''."""
+        data_dir = tmp_path / "numeric"
+        write_csv_files(
+            pd.DataFrame(
+                {
+                    "fund_ticker": ["IEMG", "IEMG"],
+                    "stock_ticker": ["005930", "7203"],
+                    "weight": [3.0, 2.0],
+                }
+            ),
+            pd.DataFrame({"ticker": ["005930", "7203"]}),
+            pd.DataFrame({"ticker": ["IEMG"]}),
+            output_dir=data_dir,
+        )
+
+        index = HoldingsIndex(build_index(data_dir, tmp_path / "numeric_index"))
+
+        assert [h["ticker"] for h in index.fund_holdings("IEMG")] == ["005930", "7203"]
+        assert index.stock_holders("005930")[0]["weight"] == 3.0
+
+    def test_encode_keeps_non_string_values(self):
+        """Only missing values should encode as empty."""
+        assert list(_encode([5930, None, float("nan"), "AAPL"])) == [
+            b"5930",
+            b"",
+            b"",
+            b"AAPL",
+        ]
+
+    def test_rebuild_prunes_old_builds(self, index, tmp_path):
+        """A rebuild should publish a new version and prune old builds."""
+        first_version = index.version
+
+        for _ in range(KEEP_BUILDS + 1):
+            build_index(tmp_path / "data", tmp_path / "index")
+
+        reopened = HoldingsIndex(tmp_path / "index")
+        builds = [b.name for b in (tmp_path / "index" / INDEX_BUILDS).iterdir()]
+
+        assert reopened.version != first_version
+        assert len(builds) == KEEP_BUILDS
+        assert reopened.version in builds
+        # The original reader keeps its (now removed) build mapped
+        assert [h["ticker"] for h in index.fund_holdings("IVV")] == [
+            "AAPL",
+            "MSFT",
+            "XOM",
+        ]
+
+
+class TestServer:
+    """Tests for the HTTP server."""
+
+    @pytest.fixture
+    def server(self, index):
+        """Serve the index on a free port."""
+        server = make_server(index.index_dir, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def test_parse_portfolio(self):
+        """Portfolio specs should parse into fund → amount."""
+        assert parse_portfolio("IVV:1000, QQQ:500") == {"IVV": 1000.0, "QQQ": 500.0}
+        assert parse_portfolio("IVV") == {"IVV": 100.0}
+        with pytest.raises(ValueError):
+            parse_portfolio("")
+
+    @pytest.mark.parametrize("amount", ["-100", "0", "nan", "inf", "abc"])
+    def test_parse_portfolio_rejects_invalid_amounts(self, amount):
+        """Amounts must be finite and positive."""
+        with pytest.raises(ValueError):
+            parse_portfolio(f"IVV:{amount}")
+
+    def test_endpoints(self, server):
+        """Endpoints should return JSON, 404 for unknown tickers, 400 for bad input."""
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        with urlopen(f"{base}/funds/IVV/holdings?limit=1") as response:
+            body = json.load(response)
+        assert body["holdings"][0]["ticker"] == "AAPL"
+
+        with urlopen(f"{base}/sectors?funds=IVV:100") as response:
+            body = json.load(response)
+        assert body["sectors"][0]["sector"] == "Technology"
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base}/funds/VOO/holdings")
+        assert error.value.code == 404
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base}/exposure?funds=IVV:nan")
+        assert error.value.code == 400
+
+    def test_server_picks_up_rebuild(self, server, tmp_path):
+        """The server should answer from a new build without a restart."""
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        write_csv_files(
+            pd.DataFrame(
+                {"fund_ticker": ["VOO"], "stock_ticker": ["AAPL"], "weight": [100.0]}
+            ),
+            pd.DataFrame({"ticker": ["AAPL"]}),
+            pd.DataFrame({"ticker": ["VOO"]}),
+            output_dir=tmp_path / "data",
+        )
+        build_index(tmp_path / "data", tmp_path / "index")
+
+        with urlopen(f"{base}/funds/VOO/holdings") as response:
+            body = json.load(response)
+        assert body["holdings"][0]["ticker"] == "AAPL"
+
+    def test_bad_counts_rejected(self, server):
+        """Negative or non-numeric limits should return 400."""
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        for path in ["/funds/IVV/holdings?limit=-1", "/exposure?funds=IVV&n=x"]:
+            with pytest.raises(HTTPError) as error:
+                urlopen(base + path)
+            assert error.value.code == 400
+
+    def test_missing_index_returns_503(self, server, tmp_path):
+        """A missing or pruned index should return a JSON 503."""
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        (tmp_path / "index" / INDEX_POINTER).unlink()
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base}/funds/IVV/holdings")
+        assert error.value.code == 503
+        assert "unavailable" in json.load(error.value)["error"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for ETF Holdings Data-Quality Validation
+"""
+
+import pandas as pd
+import pytest
+
+from validate import report_problems, validate_holdings
+
+
+def make_holdings(weights_by_fund):
+    """Build a holdings DataFrame from fund → {stock: weight}."""
+    rows = [
+        {"fund_ticker": fund, "stock_ticker": stock, "weight": weight}
+        for fund, weights in weights_by_fund.items()
+        for stock, weight in weights
+    ]
+    return pd.DataFrame(rows)
+
+
+def make_funds(holdings_df):
+    """Build funds metadata matching a holdings DataFrame."""
+    counts = holdings_df.groupby("fund_ticker").size()
+    return pd.DataFrame({"ticker": counts.index, "total_holdings": counts.values})
+
+
+class TestValidateHoldings:
+    """Tests for the per-fund data-quality checks."""
+
+    def test_clean_data_passes(self):
+        """Percent weights summing to ~100 should pass every check."""
+        holdings_df = make_holdings(
+            {"IVV": [("AAPL", 60.0), ("MSFT", 39.5)], "QQQ": [("AAPL", 100.0)]}
+        )
+
+        report = validate_holdings(holdings_df, make_funds(holdings_df))
+
+        assert report["passed"].all()
+        assert report.loc["IVV", "weight_sum"] == pytest.approx(99.5)
+        assert report_problems(report) == []
+
+    def test_weight_sum_out_of_range(self):
+        """Funds whose weights don't sum to ~100% should fail."""
+        holdings_df = make_holdings({"IVV": [("AAPL", 50.0), ("MSFT", 20.0)]})
+
+        report = validate_holdings(holdings_df, make_funds(holdings_df))
+
+        assert not report.loc["IVV", "weight_sum_ok"]
+        assert "IVV: weights sum to 70.00%" in report_problems(report)[0]
+
+    def test_weight_above_100_fails_units(self):
+        """A weight no percentage can take should fail the units check."""
+        holdings_df = make_holdings({"IVV": [("AAPL", 150.0), ("MSFT", -50.0)]})
+
+        report = validate_holdings(holdings_df, make_funds(holdings_df))
+
+        assert not report.loc["IVV", "units_ok"]
+        assert report.loc["IVV", "weight_sum_ok"]
+        assert "above 100%" in report_problems(report)[0]
+
+    def test_unconverted_fractions_fail_weight_sum(self):
+        """Fractions that slipped past normalization should fail the sum check."""
+        holdings_df = make_holdings({"IVV": [("AAPL", 0.6), ("MSFT", 0.4)]})
+
+        report = validate_holdings(holdings_df, make_funds(holdings_df))
+
+        assert not report.loc["IVV", "weight_sum_ok"]
+        assert not report.loc["IVV", "passed"]
+
+    def test_duplicate_rows_detected(self):
+        """The same stock listed twice in a fund should fail."""
+        holdings_df = make_holdings(
+            {"IVV": [("AAPL", 50.0), ("AAPL", 50.0)], "QQQ": [("AAPL", 100.0)]}
+        )
+
+        report = validate_holdings(holdings_df, make_funds(holdings_df))
+
+        assert report.loc["IVV", "duplicates"] == 1
+        assert not report.loc["IVV", "duplicates_ok"]
+        assert report.loc["QQQ", "duplicates_ok"]
+
+    def test_holdings_drop_against_previous(self):
+        """A sharp fall in holdings count, or a vanished fund, should fail."""
+        holdings_df = make_holdings({"IVV": [("AAPL", 100.0)]})
+        previous_funds_df = pd.DataFrame(
+            {"ticker": ["IVV", "QQQ"], "total_holdings": [2, 1]}
+        )
+
+        report = validate_holdings(
+            holdings_df, make_funds(holdings_df), previous_funds_df
+        )
+
+        assert report.loc["IVV", "holdings_change"] == pytest.approx(-0.5)
+        assert not report.loc["IVV", "holdings_drop_ok"]
+        assert report.loc["QQQ", "holdings"] == 0
+        assert not report.loc["QQQ", "holdings_drop_ok"]
+        assert report.loc["QQQ", "weight_sum_ok"]
+
+    def test_untracked_previous_fund_ignored(self):
+        """Funds removed from TRACKED_ETFS should not count as a drop."""
+        holdings_df = make_holdings({"IVV": [("AAPL", 100.0)]})
+        previous_funds_df = pd.DataFrame(
+            {"ticker": ["IVV", "OLD"], "total_holdings": [1, 500]}
+        )
+
+        report = validate_holdings(
+            holdings_df,
+            make_funds(holdings_df),
+            previous_funds_df,
+            tracked_tickers=["IVV"],
+        )
+
+        assert "OLD" not in report.index
+        assert report["passed"].all()
+
+    def test_new_fund_passes_drop_check(self):
+        """Funds without a previous count should not fail the drop check."""
+        holdings_df = make_holdings({"IVV": [("AAPL", 100.0)]})
+        previous_funds_df = pd.DataFrame({"ticker": ["QQQ"], "total_holdings": [1]})
+
+        report = validate_holdings(
+            holdings_df, make_funds(holdings_df), previous_funds_df
+        )
+
+        assert report.loc["IVV", "holdings_drop_ok"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+ETF Holdings Data-Quality Validation
+
+Checks collected holdings before they are published. All checks are
+computed in a single grouped pass over the holdings, producing one report
+row per fund.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from config import MAX_HOLDINGS_DROP, TRACKED_ETFS, WEIGHT_SUM_RANGE
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CHECK_COLUMNS = ["weight_sum_ok", "units_ok", "holdings_drop_ok", "duplicates_ok"]
+
+
+def validate_holdings(
+    holdings_df: pd.DataFrame,
+    funds_df: pd.DataFrame,
+    previous_funds_df: pd.DataFrame | None = None,
+    tracked_tickers: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Run the data-quality checks for every fund.
+
+    Checks:
+        weight_sum_ok: weights sum to within WEIGHT_SUM_RANGE percent
+        units_ok: no weight is above 100%
+        holdings_drop_ok: holdings count fell by at most MAX_HOLDINGS_DROP
+            against the previous funds.csv
+        duplicates_ok: no fund lists the same stock twice
+
+    Args:
+        holdings_df: Holdings to publish
+        funds_df: Fund metadata to publish
+        previous_funds_df: The currently published funds.csv, if any
+        tracked_tickers: Funds still being collected (defaults to
+            TRACKED_ETFS); previous funds outside these were dropped on
+            purpose and are not compared
+
+    Returns:
+        DataFrame: one row per fund, indexed by fund ticker, with the
+        measured values, a column per check and an overall "passed" column
+
+    normalize_holdings_df already converts funds reported as fractions to
+    percentages, so units_ok only catches weights no percentage can take.
+    A fund mixing fractions and percentages can't be told apart row by row
+    (small percentages look like fractions); it shows up as a weight sum
+    outside WEIGHT_SUM_RANGE instead.
+    """
+    import pandas as pd
+
+    per_fund = (
+        holdings_df.assign(
+            duplicate=holdings_df.duplicated(["fund_ticker", "stock_ticker"])
+        )
+        .groupby("fund_ticker")
+        .agg(
+            holdings=("stock_ticker", "size"),
+            weight_sum=("weight", "sum"),
+            weight_max=("weight", "max"),
+            duplicates=("duplicate", "sum"),
+        )
+    )
+
+    fund_tickers = pd.Index(funds_df["ticker"], name="fund_ticker")
+    if previous_funds_df is not None:
+        if tracked_tickers is None:
+            tracked_tickers = [t for etfs in TRACKED_ETFS.values() for t in etfs]
+        still_tracked = fund_tickers.union(pd.Index(list(tracked_tickers)))
+        previous_holdings = previous_funds_df.set_index("ticker")["total_holdings"]
+        previous_holdings = previous_holdings[
+            previous_holdings.index.isin(still_tracked)
+        ]
+        fund_tickers = fund_tickers.union(previous_holdings.index)
+    else:
+        previous_holdings = pd.Series(dtype="float64")
+
+    # Funds that disappeared since the last run show up with zero holdings
+    report = per_fund.reindex(per_fund.index.union(fund_tickers))
+    report.index.name = "fund_ticker"
+    report[["holdings", "duplicates"]] = (
+        report[["holdings", "duplicates"]].fillna(0).astype(int)
+    )
+    report["previous_holdings"] = previous_holdings.reindex(report.index)
+    report["holdings_change"] = report["holdings"] / report["previous_holdings"] - 1
+
+    has_holdings = report["holdings"] > 0
+    low, high = WEIGHT_SUM_RANGE
+    report["weight_sum_ok"] = ~has_holdings | report["weight_sum"].between(low, high)
+    report["units_ok"] = ~(report["weight_max"] > 100)
+    report["holdings_drop_ok"] = ~(report["holdings_change"] < -MAX_HOLDINGS_DROP)
+    report["duplicates_ok"] = report["duplicates"] == 0
+    report["passed"] = report[CHECK_COLUMNS].all(axis=1)
+
+    return report
+
+
+def report_problems(report: pd.DataFrame) -> list[str]:
+    """Describe each failed check in a validation report."""
+    problems = []
+    low, high = WEIGHT_SUM_RANGE
+
+    for fund, row in report[~report["passed"]].iterrows():
+        if not row["weight_sum_ok"]:
+            problems.append(
+                f"{fund}: weights sum to {row['weight_sum']:.2f}%, "
+                f"expected {low:g}-{high:g}%"
+            )
+        if not row["units_ok"]:
+            problems.append(
+                f"{fund}: weight of {row['weight_max']:.4g}% is above 100%; "
+                f"check the provider's units"
+            )
+        if not row["holdings_drop_ok"]:
+            problems.append(
+                f"{fund}: holdings dropped from {int(row['previous_holdings'])} "
+                f"to {row['holdings']} ({row['holdings_change']:.0%})"
+            )
+        if not row["duplicates_ok"]:
+            problems.append(f"{fund}: {row['duplicates']} duplicate stock rows")
+
+    return problems